@@ -1,14 +1,35 @@
 import os
+import re
+import sys
+import hmac
+import socket
+import time
+import asyncio
 import logging
+import functools
 import discord
 import aiohttp
 from discord.ext import commands
 from aiohttp import web
+from dotenv import load_dotenv
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    json_loads = json.loads
 
 # 1. Setup & Config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("SongTailorBot")
 
+# Everything below is read once here; the webhook path never touches the env again
+load_dotenv()
+REQUIRED_ENV = ("DISCORD_BOT_TOKEN", "TARGET_CHANNEL_ID", "SUPABASE_JWT_SECRET")
+missing = [name for name in REQUIRED_ENV if not os.getenv(name)]
+if missing: raise SystemExit(f"Missing required environment variables: {', '.join(missing)}")
+
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 TARGET_CHANNEL_ID = int(os.getenv("TARGET_CHANNEL_ID"))
 WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
@@ -17,126 +38,461 @@ WEBHOOK_SECRET = os.getenv("SUPABASE_JWT_SECRET")
 # Database Connection (For looking up names)
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+SUPABASE_HEADERS = {
+    "apikey": SUPABASE_KEY,
+    "Authorization": f"Bearer {SUPABASE_KEY}"
+}
+HAS_SUPABASE = bool(SUPABASE_URL and SUPABASE_KEY)  # profile lookups are optional
+PROFILE_TTL = 300         # seconds a looked-up profile name is reused
+MISSING_PROFILE_TTL = 30  # shorter, so a profile created after the request shows up soon
+PROFILE_CACHE_SIZE = 1024  # hard cap on cached profiles
+
+# Briefings that arrive close together go out as one message
+BATCH_WINDOW = 0.2  # seconds to wait for more webhooks after the first
+MAX_EMBEDS = 10     # Discord's per-message embed limit
+MAX_PENDING = 256   # queued webhooks before we answer 503 and let Supabase retry
+
+# Supabase only ever POSTs small JSON bodies
+MAX_BODY_SIZE = 256 * 1024
+
+# Supabase profile ids (auth.users) are UUIDs
+UUID_RE = re.compile(r'[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}')
+
+# Matches the 11-char video id in watch?v=, youtu.be/, /embed/ and /shorts/ links
+YT_ID_RE = re.compile(r'(?:v=|youtu\.be/|/embed/|/shorts/)([A-Za-z0-9_-]{11})')
+
+# A usable track URL has no whitespace; a newline in one would split its tracklist line
+TRACK_URL_RE = re.compile(r'\S+')
+
+# Embed accent per genre; anything not listed gets the default purple
+GENRE_COLORS = {'rnr': 0xe67e22}
+DEFAULT_COLOR = 0x9b59b6
+
+# Discord rejects the whole message if any embed goes past these
+MAX_TITLE_LEN = 256
+MAX_DESCRIPTION_LEN = 4096
+MAX_FIELD_LEN = 1024
+MAX_FOOTER_LEN = 2048
+MAX_EMBED_LEN = 6000  # everything in one embed put together
+
+def clip(text, limit):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+# Budgets are shown with space-separated thousands (1 500 000 FT)
+THOUSANDS_SPACES = str.maketrans(',', ' ')
+
+# Only the record fields the embeds actually read
+RECORD_FIELDS = ('user_id', 'title', 'total_price', 'genre', 'target_bpm', 'deadline')
+
+def extract_record(data):
+    record = data.get('record') or {}
+    slim = {k: record[k] for k in RECORD_FIELDS if k in record}
+    tracks = record.get('tracks')
+    if not isinstance(tracks, list): tracks = ()
+    # Tracks without a usable URL can't be previewed, so they're dropped here in the same pass;
+    # the rest are kept as compact (title, url) pairs
+    slim['tracks'] = tuple(
+        (t.get('title') or 'Untitled', url)
+        for t in tracks if isinstance(t, dict) and isinstance(url := t.get('url'), str) and TRACK_URL_RE.fullmatch(url)
+    )
+    return slim
 
 # 2. The Interactive Carousel
+# Every page carries the tracklist and its position, so a click (even after a restart)
+# rebuilds the next page from the message. No per-carousel view or track list is kept;
+# discord.py's view store only maps each sent message id to the one shared view.
+ADMIN_DASHBOARD_URL = "https://song-tailor-website.vercel.app/pages/admin"
+TRACKLIST_FIELD = "🎶 Tracklist"
+TRACKLIST_MORE_FIELD = "🎶 Tracklist (cont.)"
+TRACK_LINK = "**[Click to Listen on YouTube]({})**"
+TRACKLIST_LINE_RE = re.compile(r'^\d+\. \[([^\]]*)\]\((.*)\)$')
+MAX_TRACKLIST_TITLE_LEN = 60
+FOOTER_RE = re.compile(r'^Preview (\d+) of \d+ • (.*)$', re.S)
+
+# Pages are rebuilt on every click, so the same URLs come through here again and again
+@functools.lru_cache(maxsize=1024)
+def get_yt_image(url):
+    m = YT_ID_RE.search(url)
+    return f"https://img.youtube.com/vi/{m.group(1)}/mqdefault.jpg" if m else None
+
+def pack_tracklist(lines):
+    # As few fields as the per-field limit allows; no line is longer than a field
+    fields = []
+    for line in lines:
+        if fields and len(fields[-1]) + 1 + len(line) <= MAX_FIELD_LEN: fields[-1] += "\n" + line
+        else: fields.append(line)
+    return fields
+
+def carousel_tracks(tracks, title):
+    # Brackets/newlines would break the tracklist markup, and long titles are shortened so more
+    # tracks fit. The tracklist is the same on every page, so it's formatted here once.
+    # It's spread over as many fields as the embed total leaves room for next to the longest
+    # page's title, link and footer.
+    overhead = (
+        min(len(f"🎵 Track {len(tracks)}: ") + MAX_TRACKLIST_TITLE_LEN, MAX_TITLE_LEN)
+        + len(TRACK_LINK.format(''))
+        + len(clip(f"Preview {len(tracks)} of {len(tracks)} • {title}", MAX_FOOTER_LEN))
+    )
+    result, lines, size, longest = [], [], 0, 0
+    for track_title, url in tracks:
+        track_title = clip(str(track_title).replace('[', '(').replace(']', ')').replace('\n', ' '), MAX_TRACKLIST_TITLE_LEN)
+        line = f"{len(lines) + 1}. [{track_title}]({url})"
+        # A line too long for a field on its own (a huge URL) is skipped, not left to crowd out the rest
+        if len(line) > MAX_FIELD_LEN: continue
+        # Once the lines alone are over the room left, packing them can't make them fit
+        if size + len(line) > MAX_EMBED_LEN - overhead - max(longest, len(url)): break
+        result.append((track_title, url))
+        lines.append(line)
+        size += len(line) + 1
+        longest = max(longest, len(url))
+
+    # Whatever doesn't fit is cut from the end, with a note so nobody thinks that's everything
+    while True:
+        missing = len(tracks) - len(lines)
+        fields = pack_tracklist(lines + [f"…and {missing} more not shown here"] if missing else lines)
+        names = len(TRACKLIST_FIELD) + (len(fields) - 1) * len(TRACKLIST_MORE_FIELD)
+        if names + sum(map(len, fields)) <= MAX_EMBED_LEN - overhead - longest: break
+        result.pop()
+        lines.pop()
+    return tuple(result), tuple(fields)
+
+def build_track_embed(tracks, tracklist, index, title, color):
+    track_title, url = tracks[index]
+    embed = discord.Embed(
+        title=clip(f"🎵 Track {index + 1}: {track_title}", MAX_TITLE_LEN),
+        description=TRACK_LINK.format(url),
+        color=color
+    )
+    thumb_url = get_yt_image(url)
+    if thumb_url: embed.set_image(url=thumb_url)
+    for i, value in enumerate(tracklist):
+        embed.add_field(name=TRACKLIST_MORE_FIELD if i else TRACKLIST_FIELD, value=value, inline=False)
+    embed.set_footer(text=clip(f"Preview {index + 1} of {len(tracks)} • {title}", MAX_FOOTER_LEN))
+    return embed
+
+def parse_track_embed(embed):
+    tracklist = tuple(f.value for f in embed.fields if f.name in (TRACKLIST_FIELD, TRACKLIST_MORE_FIELD))
+    tracks = tuple(
+        m.groups() for value in tracklist for line in value.split('\n') if (m := TRACKLIST_LINE_RE.match(line))
+    )
+    footer = FOOTER_RE.match(embed.footer.text)
+    return tracks, tracklist, int(footer.group(1)) - 1, footer.group(2)
+
 class CarouselView(discord.ui.View):
-    def __init__(self, tracks, record):
+    def __init__(self):
         super().__init__(timeout=None)
-        self.tracks = [t for t in tracks if t.get('url')]
-        self.record = record
-        self.current_index = 0
-        self.update_buttons()
-
-    def update_buttons(self):
-        self.back_btn.disabled = (self.current_index == 0)
-        self.next_btn.disabled = (self.current_index == len(self.tracks) - 1)
-
-    def get_yt_image(self, url):
-        if 'v=' in url: return f"https://img.youtube.com/vi/{url.split('v=')[-1].split('&')[0]}/mqdefault.jpg"
-        if 'youtu.be/' in url: return f"https://img.youtube.com/vi/{url.split('youtu.be/')[-1].split('?')[0]}/mqdefault.jpg"
-        return None
-
-    def get_embed(self):
-        track = self.tracks[self.current_index]
-        color = 0xe67e22 if self.record.get('genre') == 'rnr' else 0x9b59b6
-        
-        embed = discord.Embed(
-            title=f"🎵 Track {self.current_index + 1}: {track.get('title', 'Untitled')}",
-            description=f"**[Click to Listen on YouTube]({track.get('url')})**",
-            color=color
-        )
-        thumb_url = self.get_yt_image(track.get('url'))
-        if thumb_url: embed.set_image(url=thumb_url)
-        embed.set_footer(text=f"Preview {self.current_index + 1} of {len(self.tracks)} • {self.record.get('title')}")
-        return embed
-
-    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+        self.add_item(discord.ui.Button(label="Open Admin Dashboard", url=ADMIN_DASHBOARD_URL))
+
+    async def turn_page(self, interaction, step):
+        embed = interaction.message.embeds[0]
+        tracks, tracklist, index, title = parse_track_embed(embed)
+        if not tracks:
+            # Nothing left in the tracklist to page to; just acknowledge the click
+            await interaction.response.defer()
+            return
+        index = (index + step) % len(tracks)
+        await interaction.response.edit_message(embed=build_track_embed(tracks, tracklist, index, title, embed.colour))
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary, custom_id="carousel:back")
     async def back_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_index -= 1
-        self.update_buttons()
-        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+        await self.turn_page(interaction, -1)
 
-    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary, custom_id="carousel:next")
     async def next_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_index += 1
-        self.update_buttons()
-        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+        await self.turn_page(interaction, 1)
 
 # 3. Main Bot Logic
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+class SongTailorBot(commands.Bot):
+    def __init__(self):
+        intents = discord.Intents.default()
+        intents.message_content = True
+        super().__init__(command_prefix="!", intents=intents)
+        # `self.http` is discord.py's own client, so Supabase gets its own name
+        self.supabase = None
+        self.dispatcher = None
+        self.carousel_view = None
+        self.dashboard_view = None
+        self.profile_cache = {}    # user_id -> (expires_at, full_name)
+        self.channel = None
+        self.pending = asyncio.Queue(maxsize=MAX_PENDING)  # records waiting for the dispatcher
 
-async def handle_webhook(request):
-    if request.headers.get('X-Webhook-Secret') != WEBHOOK_SECRET:
-        return web.Response(text="Unauthorized", status=401)
+    async def setup_hook(self):
+        # One pooled session so Supabase connections stay alive between webhooks;
+        # it only ever talks to one host, so the base URL and auth headers live on it
+        if HAS_SUPABASE:
+            self.supabase = aiohttp.ClientSession(
+                base_url=SUPABASE_URL,
+                headers=SUPABASE_HEADERS,
+                connector=aiohttp.TCPConnector(limit=50, keepalive_timeout=75, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=5)
+            )
+        # One shared, persistent view handles every carousel's buttons, old or new
+        self.carousel_view = CarouselView()
+        self.add_view(self.carousel_view)
+        self.dashboard_view = discord.ui.View(timeout=None)
+        self.dashboard_view.add_item(discord.ui.Button(label="Open Admin Dashboard", url=ADMIN_DASHBOARD_URL))
+        self.dispatcher = asyncio.create_task(self.dispatch_briefings())
 
-    try:
-        data = await request.json()
-        record = data.get('record', {})
-        user_id = record.get('user_id')
-        
-        # --- 🔍 PROFILE LOOKUP START ---
-        client_name = "Unknown Profile"
-        
-        if user_id and SUPABASE_URL and SUPABASE_KEY:
+    async def dispatch_briefings(self):
+        await self.wait_until_ready()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            deadline = loop.time() + BATCH_WINDOW
+            while len(batch) < MAX_EMBEDS:
+                remaining = deadline - loop.time()
+                if remaining <= 0: break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self.deliver(batch)
+            except (discord.NotFound, discord.Forbidden) as e:
+                logger.error("Could not deliver %d briefing(s): %s", len(batch), e)
+                # The cached channel may be stale; look it up again before the next batch
+                try:
+                    self.channel = await self.fetch_channel(TARGET_CHANNEL_ID)
+                except discord.HTTPException as e:
+                    logger.error("Could not re-fetch channel %s: %s", TARGET_CHANNEL_ID, e)
+            except Exception:
+                logger.exception("Could not deliver %d briefing(s)", len(batch))
+
+    async def deliver(self, records):
+        # --- 🔍 PROFILE LOOKUP ---
+        names = await get_client_names(records)
+
+        briefings, carousels = [], []
+        for record, client_name in zip(records, names):
+            color = GENRE_COLORS.get(record.get('genre'), DEFAULT_COLOR)
+            # One bad record is skipped on its own instead of sinking the whole batch
             try:
-                async with aiohttp.ClientSession() as session:
-                    url = f"{SUPABASE_URL}/rest/v1/profiles?id=eq.{user_id}&select=full_name"
-                    headers = {
-                        "apikey": SUPABASE_KEY,
-                        "Authorization": f"Bearer {SUPABASE_KEY}"
-                    }
-                    async with session.get(url, headers=headers) as resp:
-                        if resp.status == 200:
-                            profiles = await resp.json()
-                            if profiles and len(profiles) > 0:
-                                client_name = profiles[0].get('full_name', 'Unknown')
-            except Exception as e:
-                logger.error(f"Could not fetch profile: {e}")
-        # --- 🔍 PROFILE LOOKUP END ---
-
-        channel = bot.get_channel(TARGET_CHANNEL_ID)
-        if not channel: channel = await bot.fetch_channel(TARGET_CHANNEL_ID)
-
-        # Briefing Embed
-        price = f"{int(record.get('total_price', 0)):,}".replace(',', ' ')
-        briefing = discord.Embed(
-            title=f"🚀 NEW REQUEST: {record.get('title', 'Untitled')}",
-            description=f"👤 **Profile:** {client_name}\n🆔 **User ID:** `{user_id}`\n💰 **Budget:** {price} FT",
-            color=0xe67e22 if record.get('genre') == 'rnr' else 0x9b59b6
-        )
-        briefing.add_field(name="🏷️ Genre", value=str(record.get('genre', 'N/A')).upper(), inline=True)
-        briefing.add_field(name="⏱️ BPM", value=str(record.get('target_bpm', 'Var')), inline=True)
-        briefing.add_field(name="📅 Deadline", value=str(record.get('deadline', 'ASAP')), inline=False)
-        
+                briefing = build_briefing(record, client_name, color)
+                carousel = build_carousel(record, color)
+            except Exception:
+                logger.exception("Skipping malformed request %r", record.get('title'))
+                continue
+            briefings.append(briefing)
+            if carousel: carousels.append(carousel)
+
         # 🗑️ REMOVED: The mention line (<@...>) is gone.
-        await channel.send(embed=briefing)
+        if not briefings: return
+        try:
+            await self.channel.send(embeds=briefings)
+        except discord.HTTPException as e:
+            # A 400 rejects the whole message; retry one by one so only the bad briefing is lost.
+            # Either way a rejected briefing doesn't hold back the carousels below.
+            if e.status != 400: raise
+            if len(briefings) == 1:
+                logger.error("Could not deliver briefing %r: %s", briefings[0].title, e)
+            else:
+                logger.warning("Combined briefing rejected (%s), sending %d individually", e, len(briefings))
+                for briefing in briefings:
+                    try:
+                        await self.channel.send(embed=briefing)
+                    except discord.HTTPException as e:
+                        if e.status != 400: raise
+                        logger.error("Could not deliver briefing %r: %s", briefing.title, e)
+        # A message carries a single view, so each carousel still goes out on its own,
+        # in request order so the channel reads top to bottom. One failed carousel only costs
+        # its own request; a missing or forbidden channel still goes up to the dispatcher.
+        for embed, view in carousels:
+            try:
+                await self.channel.send(embed=embed, view=view)
+            except (discord.NotFound, discord.Forbidden):
+                raise
+            except discord.HTTPException as e:
+                logger.error("Could not deliver carousel %r: %s", embed.footer.text, e)
+
+    async def close(self):
+        if self.dispatcher: self.dispatcher.cancel()
+        if self.supabase: await self.supabase.close()
+        await super().close()
+
+bot = SongTailorBot()
+
+def make_authorizer(secret):
+    # The secret and helpers are bound as closure cells, so a check does no global lookups
+    secret_bytes, secret_len, compare = secret.encode('utf-8'), len(secret), hmac.compare_digest
+
+    def is_authorized(request):
+        provided = request.headers.get('X-Webhook-Secret')
+        # Cheap rejects first; the length of the secret isn't sensitive
+        if not provided or len(provided) != secret_len:
+            return False
+        # aiohttp decodes headers with surrogateescape, so raw non-UTF-8 bytes round-trip here
+        return compare(provided.encode('utf-8', 'surrogateescape'), secret_bytes)
+    return is_authorized
 
-        # Carousel
-        tracks = record.get('tracks', [])
-        if tracks and len(tracks) > 0:
-            view = CarouselView(tracks, record)
-            view.add_item(discord.ui.Button(label="Open Admin Dashboard", url="https://song-tailor-website.vercel.app/pages/admin"))
-            await channel.send(embed=view.get_embed(), view=view)
-        
-        return web.Response(text="OK", status=200)
+is_authorized = make_authorizer(WEBHOOK_SECRET)
 
+# aiohttp responses are single-use (each is bound to the request it's written to),
+# so only the encoded bodies are shared and every call still gets a fresh Response
+RESPONSES = {
+    200: b"OK",
+    202: b"Accepted",
+    400: b"Bad Request",
+    401: b"Unauthorized",
+    413: b"Payload Too Large",
+    500: b"Internal Error",
+    503: b"Busy",
+}
+
+def respond(status):
+    return web.Response(body=RESPONSES[status], status=status, content_type='text/plain', charset='utf-8')
+
+def cache_profile(user_id, client_name, ttl):
+    cache = bot.profile_cache
+    now = time.monotonic()
+    cache.pop(user_id, None)  # re-inserted at the end, so dict order stays oldest-first
+    if len(cache) >= PROFILE_CACHE_SIZE:
+        # Once full, sweep out expired entries; if that's not enough, drop the oldest
+        for key in [k for k, (expires_at, _) in cache.items() if expires_at <= now]:
+            del cache[key]
+        while len(cache) >= PROFILE_CACHE_SIZE:
+            del cache[next(iter(cache))]
+    cache[user_id] = (now + ttl, client_name)
+
+async def query_profiles(user_ids):
+    # Values are quoted so PostgREST reads each one as a literal; None means it rejected the query
+    quoted = ','.join(f'"{u}"' for u in user_ids)
+    params = {'id': f"in.({quoted})", 'select': 'id,full_name'}
+    async with bot.supabase.get("/rest/v1/profiles", params=params) as resp:
+        if resp.status == 400:
+            logger.warning("Supabase rejected profile query for %d id(s)", len(user_ids))
+            return None
+        resp.raise_for_status()
+        return json_loads(await resp.read())
+
+async def fetch_client_names(user_ids):
+    # One PostgREST IN query for the whole batch instead of a request per user.
+    # Profile ids are UUIDs; anything else would get the whole IN query rejected.
+    valid = [u for u in user_ids if UUID_RE.fullmatch(u)]
+    try:
+        rows = await query_profiles(valid) if valid else []
+        if rows is None and len(valid) > 1:
+            # Still rejected: retry each id alone so the bad one only costs itself
+            rows = []
+            for user_id in valid:
+                rows.extend(await query_profiles([user_id]) or ())
     except Exception as e:
-        logger.error(f"CRASH: {e}")
-        return web.Response(text=f"Error: {e}", status=200)
+        logger.error("Could not fetch profiles: %s", e)
+        return {}
+
+    names = {row['id']: row.get('full_name', 'Unknown') for row in rows or ()}
+    for user_id in user_ids:
+        if user_id in names:
+            cache_profile(user_id, names[user_id], PROFILE_TTL)
+        else:
+            cache_profile(user_id, "Unknown Profile", MISSING_PROFILE_TTL)
+    return names
+
+async def get_client_names(records):
+    names, uncached = {}, set()
+    # Only string ids can be profile UUIDs (and other JSON values may not even be hashable)
+    user_ids = [uid if isinstance(uid := record.get('user_id'), str) else None for record in records]
+    now = time.monotonic()
+    for user_id in user_ids:
+        if not user_id or not HAS_SUPABASE: continue
+        cached = bot.profile_cache.get(user_id)
+        if cached and now < cached[0]: names[user_id] = cached[1]
+        else: uncached.add(user_id)
+
+    if uncached: names.update(await fetch_client_names(uncached))
+    return [names.get(user_id, "Unknown Profile") for user_id in user_ids]
+
+async def handle_clear_cache(request):
+    if not is_authorized(request):
+        return respond(401)
+
+    user_id = request.query.get('user_id')
+    if user_id: bot.profile_cache.pop(user_id, None)
+    else: bot.profile_cache.clear()
+    return respond(200)
+
+def build_briefing(record, client_name, color):
+    price = format(int(record.get('total_price') or 0), ',').translate(THOUSANDS_SPACES)
+    briefing = discord.Embed(
+        title=clip(f"🚀 NEW REQUEST: {record.get('title', 'Untitled')}", MAX_TITLE_LEN),
+        description=clip(f"👤 **Profile:** {client_name}\n🆔 **User ID:** `{record.get('user_id')}`\n💰 **Budget:** {price} FT", MAX_DESCRIPTION_LEN),
+        color=color
+    )
+    # Discord also rejects empty field values, so blank ones fall back to the defaults
+    briefing.add_field(name="🏷️ Genre", value=clip(str(record.get('genre') or 'N/A').upper(), MAX_FIELD_LEN), inline=True)
+    briefing.add_field(name="⏱️ BPM", value=clip(record.get('target_bpm') or 'Var', MAX_FIELD_LEN), inline=True)
+    briefing.add_field(name="📅 Deadline", value=clip(record.get('deadline') or 'ASAP', MAX_FIELD_LEN), inline=False)
+    return briefing
+
+def build_carousel(record, color):
+    tracks, tracklist = carousel_tracks(record.get('tracks', ()), record.get('title'))
+    if not tracks: return None
+    embed = build_track_embed(tracks, tracklist, 0, record.get('title'), color)
+    # Nothing to page through with a single track, so it only gets the dashboard link
+    return embed, bot.carousel_view if len(tracks) > 1 else bot.dashboard_view
+
+async def handle_webhook(request):
+    if not is_authorized(request):
+        return respond(401)
+    if bot.pending.full():
+        return respond(503)
+    # Refuse oversized bodies from the header alone, before buffering any of it
+    if request.content_length and request.content_length > MAX_BODY_SIZE:
+        return respond(413)
+
+    # A body that isn't a JSON object with an object `record` is the sender's mistake, not a crash
+    try:
+        payload = json_loads(await request.read())
+    except ValueError:
+        return respond(400)
+    if not isinstance(payload, dict) or not isinstance(payload.get('record') or {}, dict):
+        return respond(400)
+    logger.debug("payload=%s", payload)
+    record = extract_record(payload)
+
+    # Supabase only waits for the parse; lookup and delivery happen in the dispatcher
+    try:
+        bot.pending.put_nowait(record)
+    except asyncio.QueueFull:
+        return respond(503)
+    return respond(202)
+
+@web.middleware
+async def error_middleware(request, handler):
+    try:
+        return await handler(request)
+    except web.HTTPException:
+        raise  # aiohttp's own responses, e.g. 413 from client_max_size
+    except Exception:
+        logger.exception("Webhook failure on %s", request.path)
+        return respond(500)
 
 async def setup_server():
-    app = web.Application()
+    app = web.Application(client_max_size=MAX_BODY_SIZE, middlewares=[error_middleware])
     app.router.add_post('/webhook', handle_webhook)
-    runner = web.AppRunner(app)
+    app.router.add_delete('/cache/profiles', handle_clear_cache)
+    # No per-request access log; discord.py already owns the process signals
+    runner = web.AppRunner(app, access_log=None, handle_signals=False)
     await runner.setup()
-    await web.TCPSite(runner, '0.0.0.0', WEBHOOK_PORT).start()
+    site = web.TCPSite(runner, '0.0.0.0', WEBHOOK_PORT, backlog=512, reuse_port=hasattr(socket, 'SO_REUSEPORT'))
+    await site.start()
 
 @bot.event
 async def on_ready():
-    logger.info(f"Bot Online: {bot.user}")
-    await setup_server()
+    logger.info("Bot Online: %s", bot.user)
+    # on_ready fires again after every reconnect; the channel and server only need the first one.
+    # setup_hook runs before the cache exists and can't wait for it, so this lives here.
+    if bot.channel is None:
+        bot.channel = bot.get_channel(TARGET_CHANNEL_ID) or await bot.fetch_channel(TARGET_CHANNEL_ID)
+        await setup_server()
 
 if __name__ == "__main__":
+    # uvloop speeds up the socket I/O shared by discord.py, the webhook server and Supabase calls
+    if sys.platform != 'win32':
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
     bot.run(TOKEN)
\ No newline at end of file